@@ -1,146 +1,115 @@
 from __future__ import annotations
 import pygame
 from sys import exit
-from typing import Union
-from math import dist, radians, cos, sin, atan2, degrees, fabs
-from itertools import combinations
-from dataclasses import dataclass
-
-
-class Vector:
-    __slots__ = 'start_pos', 'end_pos', 'length'
-
-    def __init__(self, end_pos: list[float, float], start_pos: list[float, float] = (.0, .0)):
-        self.start_pos = start_pos
-        self.end_pos = end_pos
-        self.length = dist(self.end_pos, self.start_pos)
-
-    def normalize(self) -> Vector:
-        return Vector(
-            end_pos=[
-                (self.end_pos[0] - self.start_pos[0]) / self.length,
-                (self.end_pos[1] - self.start_pos[1]) / self.length
-            ]
-        )
-
-    def add(self, other: Vector) -> Vector:
-        return Vector(
-            end_pos=[
-                self.end_pos[0] + other.end_pos[0],
-                self.end_pos[1] + other.end_pos[1]
-            ]
-        )
-
-    @staticmethod
-    def sub(vec1: Vector, vec2: Vector) -> Vector:
-        return Vector(
-            end_pos=[
-                vec1.end_pos[0] - vec2.end_pos[0],
-                vec1.end_pos[1] - vec2.end_pos[1]
-            ]
-        )
-
-    def mul(self, other: Union[Vector, float]) -> Union[Vector, float]:
-        return self.end_pos[0] * other.end_pos[0] + self.end_pos[1] * other.end_pos[1] if isinstance(other, Vector) else Vector(
-            end_pos=[
-                self.end_pos[0] * other, self.end_pos[1] * other
-            ]
-        )
-
-    def __repr__(self):
-        return f'Vector({self.length=}, {self.end_pos=}, {self.start_pos=})'
-
-    def __mul__(self, other: Union[Vector, float]) -> Union[Vector, float]:
-        return self.mul(other)
-
-    def __rmul__(self, other: Union[Vector, float]) -> Union[Vector, float]:
-        return self.mul(other)
-
-    def __sub__(self, other: Vector) -> Vector:
-        return self.sub(self, other)
-
-    def __rsub__(self, other: Vector) -> Vector:
-        return self.sub(other, self)
-
-    def __add__(self, other: Vector) -> Vector:
-        return self.add(other)
-
-    def __radd__(self, other: Vector) -> Vector:
-        return self.add(other)
-
-
-class Ball:
-    __slots__ = 'window', 'x', 'y', 'radius', 'mass', 'color', 'width', 'vector'
-
-    def __init__(self, window, center: tuple[Union[int, float], Union[int, float]], radius: float, velocity: float, angle: float, color: tuple = (255, 255, 255, 100), width: int = 0):
-        self.window = window
-        self.x = center[0]
-        self.y = center[1]
-        self.radius = radius
-        self.mass = radius
-        self.color = color
-        self.width = width
-        self.vector = Vector(end_pos=[velocity * cos(radians(angle)), velocity * sin(radians(angle))])
-
-    @staticmethod
-    def calculate_velocity(ball: Ball, other: Ball) -> Vector:
-        unit_normal = Vector(start_pos=[ball.x, ball.y], end_pos=[other.x, other.y]).normalize()
-        unit_tangent = Vector(end_pos=[-unit_normal.end_pos[1], unit_normal.end_pos[0]])
-        return ((unit_normal * ball.vector * (ball.mass - other.mass) + 2 * other.mass * unit_normal * other.vector) / (ball.mass + other.mass)) * unit_normal + unit_tangent * ball.vector * unit_tangent
-
-    def collision(self, other: Ball):
-        if dist([self.x, self.y], [other.x, other.y]) < self.radius + other.radius:
-            vec1 = self.calculate_velocity(self, other)
-            vec2 = self.calculate_velocity(other, self)
-            self.vector, other.vector = vec1, vec2
+from typing import Union, Callable
+from math import hypot, radians, cos, sin, atan2, degrees
+from dataclasses import dataclass, field
+from itertools import compress
+import numpy as np
+import physics
 
-    def update(self):
-        if (a := self.x + self.radius > self.window.get_width()) or self.x - self.radius < 0:
-            self.vector.end_pos[0] *= -1
-            self.x = fabs(a * self.window.get_width() - self.radius)
-        if (b := self.y + self.radius > self.window.get_height()) or self.y - self.radius < 0:
-            self.vector.end_pos[1] *= -1
-            self.y = fabs(b * self.window.get_height() - self.radius)
-        self.x += self.vector.end_pos[0]
-        self.y += self.vector.end_pos[1]
+pygame.init()
+_COS, _SIN = tuple(cos(radians(i)) for i in range(360)), tuple(sin(radians(i)) for i in range(360))
 
-    def draw(self):
-        pygame.draw.circle(self.window, color=self.color, center=(self.x, self.y), radius=self.radius, width=self.width)
+
+@dataclass(slots=True)
+class Balls:
+    xs: np.ndarray = field(default_factory=lambda: np.empty(0))
+    ys: np.ndarray = field(default_factory=lambda: np.empty(0))
+    vxs: np.ndarray = field(default_factory=lambda: np.empty(0))
+    vys: np.ndarray = field(default_factory=lambda: np.empty(0))
+    radii: np.ndarray = field(default_factory=lambda: np.empty(0))
+    masses: np.ndarray = field(default_factory=lambda: np.empty(0))
+    colors: list[tuple] = field(default_factory=list)
+    widths: list[int] = field(default_factory=list)
+    sprites: dict[tuple[int, tuple, int], pygame.Surface] = field(default_factory=dict)
+    kernel: tuple[int, Callable] = (0, physics.step)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def append(self, center: tuple[Union[int, float], Union[int, float]], radius: float, velocity: float, angle: float, color: tuple = (255, 255, 255, 100), width: int = 0):
+        self.xs = np.append(self.xs, center[0])
+        self.ys = np.append(self.ys, center[1])
+        self.vxs = np.append(self.vxs, velocity * _COS[a := round(angle) % 360])
+        self.vys = np.append(self.vys, velocity * _SIN[a])
+        self.radii = np.append(self.radii, radius)
+        self.masses = np.append(self.masses, radius)
+        self.colors.append(color)
+        self.widths.append(width)
+
+    def remove(self, mask: np.ndarray):
+        keep = ~mask
+        self.xs, self.ys, self.vxs, self.vys = self.xs[keep], self.ys[keep], self.vxs[keep], self.vys[keep]
+        self.radii, self.masses = self.radii[keep], self.masses[keep]
+        self.colors, self.widths = list(compress(self.colors, kept := keep.tolist())), list(compress(self.widths, kept))
+        in_use = set(zip(self.radii.astype(int).tolist(), self.colors, self.widths))
+        self.sprites = {key: sprite for key, sprite in self.sprites.items() if key in in_use}
+
+    def specialize(self):
+        self.kernel = len(self), physics.compile_step(len(self))
+
+    def update(self, width: int, height: int):
+        step = self.kernel[1] if self.kernel[0] == len(self) else physics.step
+        step(self.xs, self.ys, self.vxs, self.vys, self.radii, self.masses, width, height)
+
+    def sprite(self, radius: int, color: tuple, width: int) -> pygame.Surface:
+        if (sprite := self.sprites.get(key := (radius, color, width))) is None:
+            sprite = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, color=color[:3], center=(radius, radius), radius=radius, width=width)
+            sprite = self.sprites[key] = sprite.convert_alpha()
+        return sprite
+
+    def draw(self, window: pygame.Surface):
+        radii = self.radii.astype(int)
+        lefts, tops = (self.xs - radii).astype(int).tolist(), (self.ys - radii).astype(int).tolist()
+        window.blits(zip(map(self.sprite, radii.tolist(), self.colors, self.widths), zip(lefts, tops)), doreturn=False)
 
 
 @dataclass(slots=True)
 class WindowVariables:
-    balls: list[Ball]
-    pause: tuple[int, int] = (0, 1)
-    press_pos: tuple[Union[float, int], Union[float, int]] = (0, 0)
+    balls: Balls
+    paused: bool = False
+    press_pos: tuple[int, int] = (0, 0)
+    mouse_pos: tuple[int, int] = (0, 0)
+    dragging: bool = False
     ball_size: int = 50
     increment: int = 1
 
 
 class Window(WindowVariables):
+    __slots__ = 'window', 'clock', '_font', '_text_cache'
+
     def __init__(self, title: str):
         self.window = pygame.display.set_mode(flags=pygame.FULLSCREEN)
-        super().__init__(
-            balls=[
-                Ball(self.window, (500, 500), 50, 0, 0),
-                Ball(self.window, (800, 530), 50, 5, 180),
-                Ball(self.window, (1500, 500), 50, 0, 0),
-                Ball(self.window, (1500, 800), 50, 5, -90)
-            ]
-        )
-        pygame.init()
+        super().__init__(balls=Balls())
+        self.balls.append((500, 500), 50, 0, 0)
+        self.balls.append((800, 530), 50, 5, 180)
+        self.balls.append((1500, 500), 50, 0, 0)
+        self.balls.append((1500, 800), 50, 5, -90)
+        self.balls.specialize()
         pygame.display.set_caption(title)
         self.clock = pygame.time.Clock()
+        self._font = pygame.font.SysFont('arial', 50)
+        self._text_cache: dict[tuple[str, int], pygame.Surface] = {}
+
+    def _text(self, label: str, value: int) -> pygame.Surface:
+        if (surface := self._text_cache.pop((label, value), None)) is None:
+            surface = self._font.render(f'{label}: {value}', True, (100, 100, 255))
+            if len(self._text_cache) >= 256:
+                del self._text_cache[next(iter(self._text_cache))]
+        self._text_cache[label, value] = surface
+        return surface
 
     def update(self):
-        for ball in self.balls:
-            if not list(self.pause)[0]:
-                ball.update()
-            ball.draw()
-        [ball.collision(other) for ball, other in combinations(self.balls, 2) if not list(self.pause)[0]]
-        self.window.blit(pygame.font.SysFont('arial', 50).render(f'Fps: {str(int(self.clock.get_fps()))}', True, (100, 100, 255)), (20, 20))
-        self.window.blit(pygame.font.SysFont('arial', 50).render(f'Size: {str(self.ball_size)}', True, (100, 100, 255)), (20, 100))
-        self.window.blit(pygame.font.SysFont('arial', 50).render(f'Parts: {str(len(self.balls))}', True, (100, 100, 255)), (20, 180))
+        if not self.paused:
+            self.balls.update(*self.window.get_size())
+
+    def draw(self):
+        self.balls.draw(self.window)
+        self.window.blit(self._text('Fps', int(self.clock.get_fps())), (20, 20))
+        self.window.blit(self._text('Size', self.ball_size), (20, 100))
+        self.window.blit(self._text('Parts', len(self.balls)), (20, 180))
         pygame.display.update()
 
     def event_handler(self):
@@ -151,25 +120,31 @@ class Window(WindowVariables):
                 if event.key == pygame.K_ESCAPE:
                     exit()
                 if event.key == pygame.K_SPACE:
-                    self.pause = self.pause[::-1]
+                    self.paused = not self.paused
             if event.type == pygame.MOUSEWHEEL:
                 self.ball_size = (a if (a := self.ball_size + self.increment) < 300 else 300) if event.y > 0 else (b if (b := self.ball_size - self.increment) > 1 else 1)
+            if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                self.mouse_pos = event.pos
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    self.press_pos = pygame.mouse.get_pos()
+                    self.press_pos = self.mouse_pos
+                    self.dragging = True
                 elif event.button == 3:
-                    [self.balls.remove(ball) for ball in filter(lambda ball: dist((ball.x, ball.y), pygame.mouse.get_pos()) < ball.radius, self.balls) if ball in self.balls]
+                    mx, my = self.mouse_pos
+                    self.balls.remove((self.balls.xs - mx) ** 2 + (self.balls.ys - my) ** 2 < self.balls.radii ** 2)
             if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-                self.balls.append(Ball(self.window, (a := pygame.mouse.get_pos()), self.ball_size, dist([self.press_pos[0], self.press_pos[1]], [a[0], a[1]]) // 20, degrees(atan2((self.press_pos[1] - a[1]), self.press_pos[0] - a[0]))))
-        keys = pygame.mouse.get_pressed()
-        if keys[0]:
-            pygame.draw.line(self.window, (255, 255, 255), self.press_pos, pygame.mouse.get_pos(), width=3)
+                self.dragging = False
+                (px, py), (ax, ay) = self.press_pos, self.mouse_pos
+                self.balls.append((ax, ay), self.ball_size, int(hypot(px - ax, py - ay) // 20), degrees(atan2(py - ay, px - ax)))
+        if self.dragging:
+            pygame.draw.line(self.window, (255, 255, 255), self.press_pos, self.mouse_pos, width=3)
 
     def run(self):
         while True:
             self.window.fill((0, 0, 0))
             self.event_handler()
             self.update()
+            self.draw()
             self.clock.tick(60)
 
 
@@ -0,0 +1,142 @@
+from math import sqrt
+from itertools import combinations
+import numpy as np
+from numba import njit, prange, types, void, boolean, float64, int64
+
+vec = float64[::1]
+pairs = types.UniTuple(int64[::1], 2)
+GRID_THRESHOLD = 150
+
+
+@njit(types.UniTuple(float64, 4)(float64, float64, float64, float64, float64, float64, float64, float64, float64, float64), cache=True, fastmath=True)
+def resolve(x1: float, y1: float, vx1: float, vy1: float, m1: float, x2: float, y2: float, vx2: float, vy2: float, m2: float) -> tuple[float, float, float, float]:
+    nx, ny = x2 - x1, y2 - y1
+    d2 = nx * nx + ny * ny
+    if d2 < 1e-12:
+        return vx1, vy1, vx2, vy2
+    inv_l = 1 / sqrt(d2)
+    nx *= inv_l
+    ny *= inv_l
+    tx, ty = -ny, nx
+    v1n, v1t = vx1 * nx + vy1 * ny, vx1 * tx + vy1 * ty
+    v2n, v2t = vx2 * nx + vy2 * ny, vx2 * tx + vy2 * ty
+    u1n = (v1n * (m1 - m2) + 2 * m2 * v2n) / (m1 + m2)
+    u2n = (v2n * (m2 - m1) + 2 * m1 * v1n) / (m1 + m2)
+    return u1n * nx + v1t * tx, u1n * ny + v1t * ty, u2n * nx + v2t * tx, u2n * ny + v2t * ty
+
+
+@njit(boolean(vec, vec, vec, int64, int64), cache=True, fastmath=True, inline='always')
+def touching(xs, ys, radii, i, j):
+    dx, dy, r = xs[i] - xs[j], ys[i] - ys[j], radii[i] + radii[j]
+    return dx * dx + dy * dy < r * r
+
+
+@njit(void(vec, vec, vec, vec, vec, float64, float64), cache=True, fastmath=True)
+def move(xs, ys, vxs, vys, radii, width, height):
+    for i in range(xs.shape[0]):
+        right, bottom = xs[i] + radii[i] > width, ys[i] + radii[i] > height
+        if right or xs[i] < radii[i]:
+            vxs[i] = -vxs[i]
+            xs[i] = width - radii[i] if right else radii[i]
+        if bottom or ys[i] < radii[i]:
+            vys[i] = -vys[i]
+            ys[i] = height - radii[i] if bottom else radii[i]
+        xs[i] += vxs[i]
+        ys[i] += vys[i]
+
+
+@njit(pairs(vec, vec, vec), cache=True, fastmath=True, parallel=True)
+def scan_pairs(xs, ys, radii):
+    n = xs.shape[0]
+    counts = np.zeros(n + 1, np.int64)
+    for i in prange(n):
+        for j in range(i + 1, n):
+            if touching(xs, ys, radii, i, j):
+                counts[i + 1] += 1
+    starts = np.cumsum(counts)
+    out_i, out_j = np.empty(starts[n], np.int64), np.empty(starts[n], np.int64)
+    for i in prange(n):
+        k = starts[i]
+        for j in range(i + 1, n):
+            if touching(xs, ys, radii, i, j):
+                out_i[k], out_j[k] = i, j
+                k += 1
+    return out_i, out_j
+
+
+@njit(int64(int64, int64, int64), cache=True, inline='always')
+def cell_hash(cx, cy, mask):
+    return (cx * 73856093 ^ cy * 19349663) & mask
+
+
+@njit(types.UniTuple(int64, 2)(int64[:, ::1], int64, int64), cache=True, inline='always')
+def find_cell(table, cx, cy):
+    mask = table.shape[0] - 1
+    h = cell_hash(cx, cy, mask)
+    while table[h, 3]:
+        if table[h, 0] == cx and table[h, 1] == cy:
+            return table[h, 2], table[h, 3]
+        h = (h + 1) & mask
+    return 0, 0
+
+
+@njit(pairs(vec, vec, vec), cache=True, fastmath=True, parallel=True)
+def grid_pairs(xs, ys, radii):
+    n = xs.shape[0]
+    cell = 2 * radii.max()
+    cxs, cys = np.floor(xs / cell).astype(np.int64), np.floor(ys / cell).astype(np.int64)
+    rows = cys.max() - cys.min() + 1
+    order = np.argsort((cxs - cxs.min()) * rows + cys - cys.min(), kind='mergesort')
+    size = 2
+    while size < 2 * n:
+        size <<= 1
+    table = np.zeros((size, 4), np.int64)
+    lo = 0
+    for k in range(1, n + 1):
+        if k == n or cxs[order[k]] != cxs[order[lo]] or cys[order[k]] != cys[order[lo]]:
+            cx, cy = cxs[order[lo]], cys[order[lo]]
+            h = cell_hash(cx, cy, size - 1)
+            while table[h, 3]:
+                h = (h + 1) & (size - 1)
+            table[h, 0], table[h, 1], table[h, 2], table[h, 3] = cx, cy, lo, k
+            lo = k
+    counts = np.zeros(n + 1, np.int64)
+    for i in prange(n):
+        for cx in range(cxs[i] - 1, cxs[i] + 2):
+            for cy in range(cys[i] - 1, cys[i] + 2):
+                first, last = find_cell(table, cx, cy)
+                for k in range(first, last):
+                    if order[k] > i and touching(xs, ys, radii, i, order[k]):
+                        counts[i + 1] += 1
+    starts = np.cumsum(counts)
+    out_i, out_j = np.empty(starts[n], np.int64), np.empty(starts[n], np.int64)
+    for i in prange(n):
+        k = starts[i]
+        for cx in range(cxs[i] - 1, cxs[i] + 2):
+            for cy in range(cys[i] - 1, cys[i] + 2):
+                first, last = find_cell(table, cx, cy)
+                for m in range(first, last):
+                    if order[m] > i and touching(xs, ys, radii, i, order[m]):
+                        out_i[k], out_j[k] = i, order[m]
+                        k += 1
+        out_j[starts[i]:k].sort()
+    return out_i, out_j
+
+
+@njit(void(vec, vec, vec, vec, vec, vec, float64, float64), cache=True, fastmath=True)
+def step(xs, ys, vxs, vys, radii, masses, width, height):
+    move(xs, ys, vxs, vys, radii, width, height)
+    out_i, out_j = grid_pairs(xs, ys, radii) if xs.shape[0] > GRID_THRESHOLD else scan_pairs(xs, ys, radii)
+    for k in range(out_i.shape[0]):
+        i, j = out_i[k], out_j[k]
+        vxs[i], vys[i], vxs[j], vys[j] = resolve(xs[i], ys[i], vxs[i], vys[i], masses[i], xs[j], ys[j], vxs[j], vys[j], masses[j])
+
+
+def compile_step(n: int):
+    lines = ['def step_fixed(xs, ys, vxs, vys, radii, masses, width, height):', '    move(xs, ys, vxs, vys, radii, width, height)']
+    for i, j in combinations(range(n), 2):
+        lines.append(f'    if touching(xs, ys, radii, {i}, {j}):')
+        lines.append(f'        vxs[{i}], vys[{i}], vxs[{j}], vys[{j}] = resolve(xs[{i}], ys[{i}], vxs[{i}], vys[{i}], masses[{i}], xs[{j}], ys[{j}], vxs[{j}], vys[{j}], masses[{j}])')
+    namespace = {'move': move, 'touching': touching, 'resolve': resolve}
+    exec(compile('\n'.join(lines), f'<step_{n}>', 'exec'), namespace)
+    return njit(void(vec, vec, vec, vec, vec, vec, float64, float64), fastmath=True)(namespace['step_fixed'])